@@ -1,28 +1,47 @@
 import ctypes
+import functools
 import signal
 import sys
 from ctypes import wintypes
 
+import shiboken6
 from PySide6 import QtCore, QtGui, QtWidgets
 
 WM_HOTKEY = 0x0312
-HOTKEY_ID = 1
+HOTKEY_ATOM_NAME = "SnipasteNano.F1"
 MOD_NOREPEAT = 0x4000
 VK_F1 = 0x70
 MAC_F1_KEYCODE = 122
+FREEZE_CAPTURE = False
+REPAINT_INTERVAL_MS = 8
+SCALE_SETTLE_MS = 150
+GRAB_DELAY_MS = 50
+SCALED_CACHE_MAX_PIXELS = 3840 * 2160
+MSG_MESSAGE_OFFSET = wintypes.MSG.message.offset
+MSG_WPARAM_OFFSET = wintypes.MSG.wParam.offset
+CANVAS_IMAGE_FORMAT = QtGui.QImage.Format_RGB32
+
+_COLOR_ICON_CACHE: dict[int, QtGui.QIcon] = {}
 
 
 class HotkeyFilter(QtCore.QAbstractNativeEventFilter):
-    def __init__(self, callback) -> None:
+    _EVENT_TYPES = (b"windows_generic_MSG", b"windows_dispatcher_MSG")
+
+    def __init__(self, callback, hotkey_id: int) -> None:
         super().__init__()
         self._callback = callback
+        self._hotkey_id = hotkey_id
 
     def nativeEventFilter(self, event_type, message):
-        if event_type in ("windows_generic_MSG", "windows_dispatcher_MSG"):
-            msg = wintypes.MSG.from_address(int(message))
-            if msg.message == WM_HOTKEY and msg.wParam == HOTKEY_ID:
-                self._callback()
-                return True, 0
+        address = int(message)
+        if ctypes.c_uint.from_address(address + MSG_MESSAGE_OFFSET).value != WM_HOTKEY:
+            return False, 0
+        if event_type.data() not in self._EVENT_TYPES:
+            return False, 0
+        w_param = ctypes.c_size_t.from_address(address + MSG_WPARAM_OFFSET).value
+        if w_param == self._hotkey_id:
+            self._callback()
+            return True, 0
         return False, 0
 
 
@@ -30,18 +49,27 @@ class CaptureOverlay(QtWidgets.QWidget):
     captured = QtCore.Signal(QtCore.QRect)
     cancelled = QtCore.Signal()
 
-    def __init__(self, screen: QtGui.QScreen, pixmap: QtGui.QPixmap) -> None:
+    def __init__(
+        self, screen: QtGui.QScreen, pixmap: QtGui.QPixmap | None = None
+    ) -> None:
         super().__init__()
         self._screen = screen
-        self._pixmap = pixmap
+        self._pixmap = pixmap if pixmap is not None else QtGui.QPixmap()
+        self._dim_pixmap = self._build_dim_pixmap(self._pixmap)
         self._origin = None
         self._current = None
+        self._pending_point = None
+        self._timer = QtCore.QBasicTimer()
         self.setWindowFlags(
             QtCore.Qt.FramelessWindowHint
             | QtCore.Qt.WindowStaysOnTopHint
             | QtCore.Qt.Tool
         )
-        self.setAttribute(QtCore.Qt.WA_TranslucentBackground, True)
+        if self._dim_pixmap.isNull():
+            self.setAttribute(QtCore.Qt.WA_TranslucentBackground, True)
+        else:
+            self.setAttribute(QtCore.Qt.WA_OpaquePaintEvent, True)
+            self.setAttribute(QtCore.Qt.WA_NoSystemBackground, True)
         self.setCursor(QtCore.Qt.CrossCursor)
         self.setFocusPolicy(QtCore.Qt.StrongFocus)
         self._set_geometry()
@@ -50,29 +78,55 @@ class CaptureOverlay(QtWidgets.QWidget):
         geometry = self._screen.geometry()
         self.setGeometry(geometry)
 
+    def _build_dim_pixmap(self, pixmap: QtGui.QPixmap) -> QtGui.QPixmap:
+        if pixmap.isNull():
+            return pixmap
+        dim_pixmap = pixmap.copy()
+        painter = QtGui.QPainter(dim_pixmap)
+        painter.fillRect(dim_pixmap.rect(), QtGui.QColor(0, 0, 0, 90))
+        painter.end()
+        return dim_pixmap
+
+    def _blit_clipped(
+        self, painter: QtGui.QPainter, pixmap: QtGui.QPixmap, rect: QtCore.QRect
+    ) -> None:
+        painter.save()
+        painter.setClipRect(rect, QtCore.Qt.IntersectClip)
+        painter.drawPixmap(0, 0, pixmap)
+        painter.restore()
+
     def _selection_rect(self) -> QtCore.QRect | None:
         if self._origin is None or self._current is None:
             return None
         rect = QtCore.QRect(self._origin, self._current).normalized()
         return rect
 
-    def paintEvent(self, _event) -> None:
+    def _paint_dim(self, painter: QtGui.QPainter, rect: QtCore.QRect) -> None:
+        if self._dim_pixmap.isNull():
+            painter.fillRect(rect, QtGui.QColor(0, 0, 0, 90))
+        else:
+            self._blit_clipped(painter, self._dim_pixmap, rect)
+
+    def paintEvent(self, event: QtGui.QPaintEvent) -> None:
+        dirty = event.rect()
         painter = QtGui.QPainter(self)
-        if not self._pixmap.isNull():
-            painter.drawPixmap(self.rect(), self._pixmap)
-        painter.fillRect(self.rect(), QtGui.QColor(0, 0, 0, 90))
         rect = self._selection_rect()
-        if rect is not None and rect.width() > 0 and rect.height() > 0:
-            if not self._pixmap.isNull():
-                ratio = self._pixmap.devicePixelRatio()
-                source_rect = QtCore.QRect(
-                    int(rect.x() * ratio), int(rect.y() * ratio),
-                    int(rect.width() * ratio), int(rect.height() * ratio),
-                )
-                painter.drawPixmap(rect, self._pixmap, source_rect)
-            pen = QtGui.QPen(QtGui.QColor(0, 0, 0), 2)
-            painter.setPen(pen)
-            painter.drawRect(rect)
+        if rect is None or rect.width() <= 0 or rect.height() <= 0:
+            self._paint_dim(painter, dirty)
+            return
+        painter.setClipRegion(QtGui.QRegion(dirty).subtracted(QtGui.QRegion(rect)))
+        self._paint_dim(painter, dirty)
+        painter.setClipRect(dirty)
+        bright = rect.intersected(dirty)
+        if not bright.isEmpty():
+            if self._pixmap.isNull():
+                # Keep a sliver of alpha so the selection still receives mouse input.
+                painter.fillRect(bright, QtGui.QColor(0, 0, 0, 1))
+            else:
+                self._blit_clipped(painter, self._pixmap, bright)
+        pen = QtGui.QPen(QtGui.QColor(0, 0, 0), 2)
+        painter.setPen(pen)
+        painter.drawRect(rect)
 
     def mousePressEvent(self, event: QtGui.QMouseEvent) -> None:
         if event.button() != QtCore.Qt.LeftButton:
@@ -84,12 +138,31 @@ class CaptureOverlay(QtWidgets.QWidget):
     def mouseMoveEvent(self, event: QtGui.QMouseEvent) -> None:
         if self._origin is None:
             return
-        self._current = event.position().toPoint()
-        self.update()
+        self._pending_point = event.position().toPoint()
+        if not self._timer.isActive():
+            self._timer.start(REPAINT_INTERVAL_MS, self)
+
+    def timerEvent(self, event: QtCore.QTimerEvent) -> None:
+        if event.timerId() != self._timer.timerId():
+            super().timerEvent(event)
+            return
+        self._timer.stop()
+        self._apply_pending_point()
+
+    def _apply_pending_point(self) -> None:
+        if self._pending_point is None or self._origin is None:
+            return
+        old = self._selection_rect()
+        self._current = self._pending_point
+        self._pending_point = None
+        new = self._selection_rect()
+        self.update(old.united(new).adjusted(-3, -3, 3, 3))
 
     def mouseReleaseEvent(self, event: QtGui.QMouseEvent) -> None:
         if event.button() != QtCore.Qt.LeftButton:
             return
+        self._timer.stop()
+        self._apply_pending_point()
         rect = self._selection_rect()
         if rect is None or rect.width() < 4 or rect.height() < 4:
             self.cancelled.emit()
@@ -110,24 +183,32 @@ class FloatingWindow(QtWidgets.QWidget):
         self._border_width = 1
         self._drag_offset = None
         self._base_pixmap = pixmap
-        self._image = pixmap.toImage().convertToFormat(QtGui.QImage.Format_ARGB32)
+        self._image = None
         self._scale = 1.0
+        self._interactive = False
         self._pen_active = False
         self._brush_size = 6
         self._brush_color = QtGui.QColor(220, 30, 30)
         self._drawing = False
-        self._last_point = None
+        self._stroke_points = []
+        self._stroke_painter = None
+        self._pending_point = None
+        self._timer = QtCore.QBasicTimer()
         self._draw_mode = "pen"
         self._line_start = None
         self._line_end = None
         self._undo_stack = []
-        self._color_popup = None
         self.setWindowFlags(
             QtCore.Qt.FramelessWindowHint
             | QtCore.Qt.WindowStaysOnTopHint
             | QtCore.Qt.Tool
         )
+        self.setAttribute(QtCore.Qt.WA_DeleteOnClose, True)
         self.setFocusPolicy(QtCore.Qt.StrongFocus)
+        self._scale_timer = QtCore.QTimer(self)
+        self._scale_timer.setSingleShot(True)
+        self._scale_timer.setInterval(SCALE_SETTLE_MS)
+        self._scale_timer.timeout.connect(self._finalize_scale)
 
         layout = QtWidgets.QVBoxLayout(self)
         layout.setContentsMargins(
@@ -176,7 +257,10 @@ class FloatingWindow(QtWidgets.QWidget):
 
         self._toolbar_layout.addStretch(1)
 
-        self._canvas = CanvasWidget(self._image, self)
+        self._color_popup = ColorPopup(self._brush_color, self)
+        self._color_popup.colorSelected.connect(self._set_brush_color)
+
+        self._canvas = CanvasWidget(self._base_pixmap, self)
         layout.addWidget(self._canvas)
         layout.addWidget(self._toolbar)
 
@@ -239,7 +323,13 @@ class FloatingWindow(QtWidgets.QWidget):
             return
         factor = 1.1 if delta > 0 else 0.9
         self._scale = max(0.2, min(5.0, self._scale * factor))
+        self._interactive = True
         self._apply_scale()
+        self._scale_timer.start()
+
+    def _finalize_scale(self) -> None:
+        self._interactive = False
+        self._canvas.set_smooth(True)
 
     def _apply_scale(self) -> None:
         ratio = self._base_pixmap.devicePixelRatio()
@@ -249,7 +339,7 @@ class FloatingWindow(QtWidgets.QWidget):
         )
         if new_size.width() < 1 or new_size.height() < 1:
             return
-        self._canvas.set_scale(self._scale)
+        self._canvas.set_scale(self._scale, smooth=not self._interactive)
         self._canvas.setFixedSize(new_size)
         self.adjustSize()
 
@@ -313,10 +403,6 @@ class FloatingWindow(QtWidgets.QWidget):
         self.close()
 
     def _show_color_popup(self) -> None:
-        if self._color_popup is not None:
-            self._color_popup.close()
-        self._color_popup = ColorPopup(self._brush_color, self)
-        self._color_popup.colorSelected.connect(self._set_brush_color)
         anchor = self._line_button if self._draw_mode == "line" else self._pen_button
         button_pos = anchor.mapToGlobal(QtCore.QPoint(0, 0))
         self._color_popup.adjustSize()
@@ -328,14 +414,13 @@ class FloatingWindow(QtWidgets.QWidget):
         self._color_popup.show()
 
     def _close_color_popup(self) -> None:
-        if self._color_popup is not None:
-            self._color_popup.close()
-            self._color_popup = None
+        self._color_popup.hide()
 
     def _set_brush_color(self, color: QtGui.QColor) -> None:
         self._brush_color = color
         self._update_pen_button_style()
         self._size_button.set_color(color)
+        self._color_popup.set_current(color)
 
     def _on_brush_size_changed(self, size: int) -> None:
         self._brush_size = size
@@ -349,11 +434,12 @@ class FloatingWindow(QtWidgets.QWidget):
         self._line_button.setStyleSheet(style)
 
     def undo(self) -> None:
+        if self._drawing:
+            self.end_draw()
         if not self._undo_stack:
             return
         self._image = self._undo_stack.pop()
-        self._canvas._image = self._image
-        self._canvas.update()
+        self._canvas.set_image(self._image)
 
     def _snap_line_end(self, start: QtCore.QPoint, end: QtCore.QPoint) -> QtCore.QPoint:
         dx = abs(end.x() - start.x())
@@ -363,43 +449,85 @@ class FloatingWindow(QtWidgets.QWidget):
         else:
             return QtCore.QPoint(start.x(), end.y())
 
+    def _ensure_image(self) -> QtGui.QImage:
+        if self._image is None:
+            image = self._base_pixmap.toImage()
+            if image.format() != CANVAS_IMAGE_FORMAT:
+                image = image.convertToFormat(CANVAS_IMAGE_FORMAT)
+            self._image = image
+            self._canvas.set_image(image, rescale=False)
+        return self._image
+
     def start_draw(self, pos: QtCore.QPoint) -> None:
         if not self._pen_active:
             return
+        if self._drawing:
+            self.end_draw()
+        self._ensure_image()
         self._undo_stack.append(self._image.copy())
         self._drawing = True
         if self._draw_mode == "line":
             self._line_start = pos
             self._line_end = pos
         else:
-            self._last_point = pos
+            self._stroke_points = [pos]
+            pen = QtGui.QPen(
+                self._brush_color, self._brush_size, QtCore.Qt.SolidLine, QtCore.Qt.RoundCap, QtCore.Qt.RoundJoin
+            )
+            self._stroke_painter = QtGui.QPainter(self._image)
+            self._stroke_painter.setRenderHint(QtGui.QPainter.Antialiasing, True)
+            self._stroke_painter.setPen(pen)
 
     def draw_to(self, pos: QtCore.QPoint) -> None:
         if not self._drawing:
             return
         if self._draw_mode == "line":
-            if self._line_start is None:
+            self._pending_point = pos
+        else:
+            self._stroke_points.append(pos)
+        if not self._timer.isActive():
+            self._timer.start(REPAINT_INTERVAL_MS, self)
+
+    def timerEvent(self, event: QtCore.QTimerEvent) -> None:
+        if event.timerId() != self._timer.timerId():
+            super().timerEvent(event)
+            return
+        self._timer.stop()
+        self._flush_pending_draw()
+
+    def _flush_pending_draw(self) -> None:
+        if not self._drawing:
+            return
+        if self._draw_mode == "line":
+            pos = self._pending_point
+            self._pending_point = None
+            if pos is None or self._line_start is None:
                 return
             end = pos
             if QtWidgets.QApplication.keyboardModifiers() & QtCore.Qt.ControlModifier:
                 end = self._snap_line_end(self._line_start, end)
+            self._update_image_rect(QtCore.QRect(self._line_start, self._line_end))
             self._line_end = end
-            self._canvas.update()
+            self._update_image_rect(QtCore.QRect(self._line_start, end))
         else:
-            if self._last_point is None:
+            if len(self._stroke_points) < 2 or self._stroke_painter is None:
                 return
-            painter = QtGui.QPainter(self._image)
-            painter.setRenderHint(QtGui.QPainter.Antialiasing, True)
-            pen = QtGui.QPen(
-                self._brush_color, self._brush_size, QtCore.Qt.SolidLine, QtCore.Qt.RoundCap, QtCore.Qt.RoundJoin
-            )
-            painter.setPen(pen)
-            painter.drawLine(self._last_point, pos)
-            painter.end()
-            self._last_point = pos
-            self._canvas.update()
+            polyline = QtGui.QPolygon(self._stroke_points)
+            self._stroke_painter.drawPolyline(polyline)
+            self._stroke_points = [self._stroke_points[-1]]
+            self._update_image_rect(polyline.boundingRect(), changed=True)
+
+    def _update_image_rect(self, rect: QtCore.QRect, changed: bool = False) -> None:
+        radius = self._brush_size
+        dirty = rect.normalized().adjusted(-radius, -radius, radius, radius)
+        if changed:
+            self._canvas.refresh_image_rect(dirty, radius)
+        else:
+            self._canvas.update_image_rect(dirty, radius)
 
     def end_draw(self) -> None:
+        self._timer.stop()
+        self._flush_pending_draw()
         if self._draw_mode == "line" and self._line_start is not None and self._line_end is not None:
             end = self._line_end
             if QtWidgets.QApplication.keyboardModifiers() & QtCore.Qt.ControlModifier:
@@ -412,37 +540,160 @@ class FloatingWindow(QtWidgets.QWidget):
             painter.setPen(pen)
             painter.drawLine(self._line_start, end)
             painter.end()
+            self._update_image_rect(QtCore.QRect(self._line_start, self._line_end))
+            self._update_image_rect(QtCore.QRect(self._line_start, end), changed=True)
             self._line_start = None
             self._line_end = None
-            self._canvas.update()
+        if self._stroke_painter is not None:
+            self._stroke_painter.end()
+            self._stroke_painter = None
+        if self._drawing:
+            self._canvas.set_image(self._image)
         self._drawing = False
-        self._last_point = None
+        self._stroke_points = []
 
     def copy_to_clipboard(self) -> None:
         clipboard = QtWidgets.QApplication.clipboard()
-        clipboard.setImage(self._image)
+        if self._image is None:
+            clipboard.setPixmap(self._base_pixmap)
+        else:
+            clipboard.setImage(self._image)
 
 
 class CanvasWidget(QtWidgets.QWidget):
-    def __init__(self, image: QtGui.QImage, parent: FloatingWindow) -> None:
+    def __init__(self, pixmap: QtGui.QPixmap, parent: FloatingWindow) -> None:
         super().__init__(parent)
-        self._image = image
+        self._pixmap = pixmap
+        self._image = None
         self._scale = 1.0
+        self._scaled_pixmap = None
+        self._failed_cache_size = None
+        self._smooth = True
         self._pen_active = False
+        self.setAttribute(QtCore.Qt.WA_StaticContents, True)
+        self.setAttribute(QtCore.Qt.WA_OpaquePaintEvent, True)
 
-    def set_scale(self, scale: float) -> None:
+    def set_scale(self, scale: float, smooth: bool = True) -> None:
         self._scale = scale
+        self._smooth = smooth
+        self._scaled_pixmap = None
+        self.update()
+
+    def set_smooth(self, smooth: bool) -> None:
+        if smooth == self._smooth:
+            return
+        self._smooth = smooth
+        self._scaled_pixmap = None
         self.update()
 
+    def set_image(self, image: QtGui.QImage, rescale: bool = True) -> None:
+        self._image = image
+        if rescale:
+            self._scaled_pixmap = None
+            self.update()
+
     def set_pen_active(self, active: bool) -> None:
         self._pen_active = active
 
+    def update_image_rect(self, rect: QtCore.QRect, margin: int = 0) -> None:
+        target = self._map_from_image(rect)
+        self.update(target.adjusted(-margin - 1, -margin - 1, margin + 1, margin + 1))
+
+    def refresh_image_rect(self, rect: QtCore.QRect, margin: int = 0) -> None:
+        if self._scaled_pixmap is not None and self._image is not None:
+            self._patch_scaled_pixmap(rect)
+        self.update_image_rect(rect, margin)
+
+    def _patch_scaled_pixmap(self, rect: QtCore.QRect) -> None:
+        cache = self._scaled_pixmap
+        image = self._image
+        fx = cache.width() / image.width()
+        fy = cache.height() / image.height()
+        ratio = image.devicePixelRatio()
+        changed = QtCore.QRectF(
+            rect.x() * ratio, rect.y() * ratio,
+            rect.width() * ratio, rect.height() * ratio,
+        ).toAlignedRect()
+        pad = int(max(1.0 / fx, 1.0 / fy)) + 3
+        source = changed.adjusted(-pad, -pad, pad, pad).intersected(image.rect())
+        if source.isEmpty():
+            return
+        left = round(source.x() * fx)
+        top = round(source.y() * fy)
+        right = round((source.x() + source.width()) * fx)
+        bottom = round((source.y() + source.height()) * fy)
+        if right <= left or bottom <= top:
+            return
+        patch = image.copy(source).scaled(
+            QtCore.QSize(right - left, bottom - top),
+            QtCore.Qt.IgnoreAspectRatio,
+            self._transform_mode(),
+        )
+        inner = QtCore.QRectF(
+            changed.x() * fx, changed.y() * fy,
+            changed.width() * fx, changed.height() * fy,
+        ).toAlignedRect().adjusted(-1, -1, 1, 1)
+        inner = inner.intersected(QtCore.QRect(left, top, right - left, bottom - top))
+        if inner.isEmpty():
+            return
+        cache_ratio = cache.devicePixelRatio()
+        cache.setDevicePixelRatio(1.0)
+        painter = QtGui.QPainter(cache)
+        painter.setCompositionMode(QtGui.QPainter.CompositionMode_Source)
+        painter.drawImage(inner.topLeft(), patch, inner.translated(-left, -top))
+        painter.end()
+        cache.setDevicePixelRatio(cache_ratio)
+
+    def _map_from_image(self, rect: QtCore.QRect) -> QtCore.QRect:
+        return QtCore.QRectF(
+            rect.x() * self._scale,
+            rect.y() * self._scale,
+            rect.width() * self._scale,
+            rect.height() * self._scale,
+        ).toAlignedRect()
+
+    def _ensure_scaled_pixmap(self) -> QtGui.QPixmap | None:
+        ratio = self.devicePixelRatioF()
+        size = QtCore.QSize(round(self.width() * ratio), round(self.height() * ratio))
+        if size.isEmpty() or size.width() * size.height() > SCALED_CACHE_MAX_PIXELS:
+            self._scaled_pixmap = None
+            return None
+        if self._scaled_pixmap is None or self._scaled_pixmap.size() != size:
+            self._scaled_pixmap = None
+            if size == self._failed_cache_size:
+                return None
+            mode = self._transform_mode()
+            if self._image is None:
+                scaled = self._pixmap.scaled(size, QtCore.Qt.IgnoreAspectRatio, mode)
+            else:
+                scaled = QtGui.QPixmap.fromImage(
+                    self._image.scaled(size, QtCore.Qt.IgnoreAspectRatio, mode)
+                )
+            if scaled.isNull():
+                self._failed_cache_size = size
+                return None
+            scaled.setDevicePixelRatio(ratio)
+            self._scaled_pixmap = scaled
+        return self._scaled_pixmap
+
+    def _transform_mode(self) -> QtCore.Qt.TransformationMode:
+        if self._smooth:
+            return QtCore.Qt.SmoothTransformation
+        return QtCore.Qt.FastTransformation
+
     def paintEvent(self, _event) -> None:
+        scaled = self._ensure_scaled_pixmap()
+        target = self.rect()
         painter = QtGui.QPainter(self)
-        painter.setRenderHint(QtGui.QPainter.SmoothPixmapTransform, True)
         painter.setRenderHint(QtGui.QPainter.Antialiasing, True)
-        target = QtCore.QRect(0, 0, self.width(), self.height())
-        painter.drawImage(target, self._image)
+        if scaled is not None:
+            painter.drawPixmap(0, 0, scaled)
+        else:
+            painter.setRenderHint(QtGui.QPainter.SmoothPixmapTransform, self._smooth)
+            if self._image is None:
+                painter.drawPixmap(target, self._pixmap)
+            else:
+                painter.drawImage(target, self._image)
         parent = self.parent()
         if (parent._draw_mode == "line" and parent._line_start is not None
                 and parent._line_end is not None):
@@ -489,8 +740,8 @@ class CanvasWidget(QtWidgets.QWidget):
             return point
         x = int(point.x() / self._scale)
         y = int(point.y() / self._scale)
-        x = max(0, min(self._image.width() - 1, x))
-        y = max(0, min(self._image.height() - 1, y))
+        x = max(0, min(self._pixmap.width() - 1, x))
+        y = max(0, min(self._pixmap.height() - 1, y))
         return QtCore.QPoint(x, y)
 
 
@@ -550,25 +801,40 @@ class ColorPopup(QtWidgets.QFrame):
             QtGui.QColor(120, 120, 120),
             QtGui.QColor(40, 40, 40),
         ]
+        self.setStyleSheet(
+            "QToolButton { border: 1px solid #222; padding: 0; }"
+            "QToolButton:checked { border: 2px solid #fff; }"
+        )
         layout = QtWidgets.QGridLayout(self)
         layout.setContentsMargins(6, 6, 6, 6)
         layout.setSpacing(4)
+        self._buttons = []
         for i, color in enumerate(self._colors):
             button = QtWidgets.QToolButton(self)
             button.setFixedSize(20, 20)
-            button.setStyleSheet(
-                "QToolButton { background-color: %s; border: 1px solid #222; }"
-                % color.name()
-            )
-            if color == current:
-                button.setStyleSheet(
-                    "QToolButton { background-color: %s; border: 2px solid #fff; }"
-                    % color.name()
-                )
-            button.clicked.connect(lambda _=False, c=color: self._select(c))
+            button.setCheckable(True)
+            button.setIcon(self._color_icon(color))
+            button.setIconSize(QtCore.QSize(16, 16))
+            button.clicked.connect(functools.partial(self._select, color))
             layout.addWidget(button, i // 5, i % 5)
-
-    def _select(self, color: QtGui.QColor) -> None:
+            self._buttons.append(button)
+        self.set_current(current)
+
+    def set_current(self, current: QtGui.QColor) -> None:
+        for color, button in zip(self._colors, self._buttons):
+            button.setChecked(color == current)
+
+    @staticmethod
+    def _color_icon(color: QtGui.QColor) -> QtGui.QIcon:
+        icon = _COLOR_ICON_CACHE.get(color.rgb())
+        if icon is None:
+            pixmap = QtGui.QPixmap(20, 20)
+            pixmap.fill(color)
+            icon = QtGui.QIcon(pixmap)
+            _COLOR_ICON_CACHE[color.rgb()] = icon
+        return icon
+
+    def _select(self, color: QtGui.QColor, _checked: bool = False) -> None:
         self.colorSelected.emit(color)
         self.close()
 
@@ -579,9 +845,11 @@ class SnipasteNanoApp(QtCore.QObject):
         self.app = QtWidgets.QApplication(sys.argv)
         self.app.setApplicationName("Snipaste Nano")
         self._hotkey_registered = False
+        self._hotkey_id = 0
         self._overlay = None
         self._capture_pixmap = None
         self._capture_screen = None
+        self._grab_pending = False
         self._floating_windows = []
         self._hotkey_filter = None
         self._mac_monitor = None
@@ -590,9 +858,10 @@ class SnipasteNanoApp(QtCore.QObject):
         self._mac_local_handler = None
 
         if sys.platform == "win32":
-            self._hotkey_filter = HotkeyFilter(self.start_capture)
-            self.app.installNativeEventFilter(self._hotkey_filter)
             self._register_hotkey()
+            if self._hotkey_registered:
+                self._hotkey_filter = HotkeyFilter(self._queue_capture, self._hotkey_id)
+                self.app.installNativeEventFilter(self._hotkey_filter)
         elif sys.platform == "darwin":
             self._register_hotkey_macos()
         self.app.aboutToQuit.connect(self._cleanup_hotkey)
@@ -608,12 +877,23 @@ class SnipasteNanoApp(QtCore.QObject):
         self._sigint_timer.start(200)
 
     def _register_hotkey(self) -> None:
+        kernel32 = ctypes.windll.kernel32
         user32 = ctypes.windll.user32
+        kernel32.GlobalAddAtomW.argtypes = [wintypes.LPCWSTR]
+        kernel32.GlobalAddAtomW.restype = wintypes.ATOM
+        kernel32.GlobalDeleteAtom.argtypes = [wintypes.ATOM]
+        kernel32.GlobalDeleteAtom.restype = wintypes.ATOM
+        self._hotkey_id = kernel32.GlobalAddAtomW(HOTKEY_ATOM_NAME)
+        if not self._hotkey_id:
+            print("Warning: global F1 hotkey atom allocation failed.")
+            return
         self._hotkey_registered = bool(
-            user32.RegisterHotKey(None, HOTKEY_ID, MOD_NOREPEAT, VK_F1)
+            user32.RegisterHotKey(None, self._hotkey_id, MOD_NOREPEAT, VK_F1)
         )
         if not self._hotkey_registered:
             print("Warning: global F1 hotkey registration failed.")
+            kernel32.GlobalDeleteAtom(self._hotkey_id)
+            self._hotkey_id = 0
 
     def _register_hotkey_macos(self) -> None:
         try:
@@ -642,7 +922,10 @@ class SnipasteNanoApp(QtCore.QObject):
 
     def _cleanup_hotkey(self) -> None:
         if self._hotkey_registered and sys.platform == "win32":
-            ctypes.windll.user32.UnregisterHotKey(None, HOTKEY_ID)
+            ctypes.windll.user32.UnregisterHotKey(None, self._hotkey_id)
+            ctypes.windll.kernel32.GlobalDeleteAtom(self._hotkey_id)
+            self._hotkey_registered = False
+            self._hotkey_id = 0
         if sys.platform == "darwin":
             try:
                 from AppKit import NSEvent
@@ -656,7 +939,7 @@ class SnipasteNanoApp(QtCore.QObject):
                 self._mac_monitor_local = None
 
     def start_capture(self) -> None:
-        if self._overlay is not None:
+        if self._overlay is not None or self._grab_pending:
             return
         cursor_pos = QtGui.QCursor.pos()
         screen = QtGui.QGuiApplication.screenAt(cursor_pos)
@@ -665,10 +948,12 @@ class SnipasteNanoApp(QtCore.QObject):
         if screen is None:
             print("No screen available for capture.")
             return
-        pixmap = screen.grabWindow(0)
-        if pixmap.isNull():
-            print("No screen content available for capture.")
-            return
+        pixmap = None
+        if FREEZE_CAPTURE:
+            pixmap = screen.grabWindow(0)
+            if pixmap.isNull():
+                print("No screen content available for capture.")
+                return
         self._capture_pixmap = pixmap
         self._capture_screen = screen
         self._overlay = CaptureOverlay(screen, pixmap)
@@ -704,16 +989,20 @@ class SnipasteNanoApp(QtCore.QObject):
                 screen = QtGui.QGuiApplication.primaryScreen()
             if screen is None:
                 return
-            pixmap = screen.grabWindow(0)
-            if pixmap.isNull():
-                return
+            # The compositor removes the hidden overlay asynchronously, so give it
+            # a moment before grabbing the pixels underneath.
+            self._grab_pending = True
+            QtCore.QTimer.singleShot(
+                GRAB_DELAY_MS, functools.partial(self._grab_region, screen, rect)
+            )
+            return
         ratio = pixmap.devicePixelRatio()
-        scaled_rect = QtCore.QRect(
-            int(rect.x() * ratio),
-            int(rect.y() * ratio),
-            int(rect.width() * ratio),
-            int(rect.height() * ratio),
-        )
+        scaled_rect = QtCore.QRectF(
+            rect.x() * ratio,
+            rect.y() * ratio,
+            rect.width() * ratio,
+            rect.height() * ratio,
+        ).toAlignedRect()
         scaled_rect = scaled_rect.intersected(
             QtCore.QRect(0, 0, pixmap.width(), pixmap.height())
         )
@@ -723,20 +1012,26 @@ class SnipasteNanoApp(QtCore.QObject):
         cropped.setDevicePixelRatio(ratio)
         self._show_floating(cropped)
 
+    def _grab_region(self, screen: QtGui.QScreen, rect: QtCore.QRect) -> None:
+        self._grab_pending = False
+        cropped = screen.grabWindow(
+            0, rect.x(), rect.y(), rect.width(), rect.height()
+        )
+        if cropped.isNull():
+            return
+        self._show_floating(cropped)
+
     def _show_floating(self, pixmap: QtGui.QPixmap) -> None:
         floating = FloatingWindow(pixmap)
         self._floating_windows.append(floating)
-        floating.destroyed.connect(
-            lambda _obj=None, win=floating: self._discard_window(win)
-        )
+        floating.destroyed.connect(self._on_floating_destroyed)
         floating.show()
         floating.activateWindow()
 
-    def _discard_window(self, window: FloatingWindow) -> None:
-        try:
-            self._floating_windows.remove(window)
-        except ValueError:
-            pass
+    def _on_floating_destroyed(self, _obj: QtCore.QObject | None = None) -> None:
+        self._floating_windows = [
+            window for window in self._floating_windows if shiboken6.isValid(window)
+        ]
 
     def run(self) -> int:
         return self.app.exec()